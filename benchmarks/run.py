@@ -0,0 +1,397 @@
+"""
+Benchmarks for transforms, operators, sampling patterns and the data pipeline.
+
+Everything runs on CPU on synthetic data generated locally, so no network or
+datasets are needed. Results are written as JSON, which can be compared
+between runs with the --compare option. This flags slower timings, and
+higher RSS after imports.
+
+Usage:
+    python benchmarks/run.py                            # Run all, write to bench_output.json
+    python benchmarks/run.py --only dwt2 patterns       # Run a subset
+    python benchmarks/run.py --output new.json --compare old.json
+
+The import benchmark also checks that importing the package and its
+NumPy-only submodules does not load TensorFlow, matplotlib or sigpy, and
+exits with an error if it does.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Make the benchmarks runnable from a checkout without installing the package
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+sys.path.insert(0, ROOT)
+
+# Modules that should only be loaded when the submodules needing them are used.
+# Keep in sync with HEAVY_MODULES in tests/test_import.py
+HEAVY_MODULES = ['tensorflow', 'matplotlib', 'sigpy']
+
+
+def timeit(func, repeat=5, number=1):
+    """
+    Time a function call.
+
+    Args:
+        func (callable):    Function without arguments to time
+        repeat (int):       Number of measurements to make
+        number (int):       Number of calls per measurement
+
+    Returns:
+        dict: Best, mean and standard deviation of the time per call, in seconds
+    """
+    func()  # Warm up
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+
+    return {
+        'best': min(times),
+        'mean': float(np.mean(times)),
+        'std': float(np.std(times)),
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+def bench_dwt2(args):
+    from tools.pywtwrappers import dwt2, idwt2
+
+    results = []
+    for n in args.sizes:
+        x = np.random.random((n, n))
+        for levels in args.levels:
+            coeffs = dwt2(x, 'db4', levels)
+            results.append({
+                'name': 'dwt2',
+                'params': {'size': n, 'levels': levels, 'wavelet': 'db4'},
+                'time': timeit(lambda: dwt2(x, 'db4', levels), args.repeat),
+            })
+            results.append({
+                'name': 'idwt2',
+                'params': {'size': n, 'levels': levels, 'wavelet': 'db4'},
+                'time': timeit(lambda: idwt2(coeffs, 'db4', levels), args.repeat),
+            })
+
+    return results
+
+
+def bench_fourier_wavelet(args):
+    from tools.npsensing import fourier_wavelet_2d
+
+    results = []
+    for n in args.sizes:
+        mask = np.random.random((n, n)) < 0.25
+        forward, adjoint = fourier_wavelet_2d('db4', 3, mask)
+
+        x = np.random.random((n, n)).astype(np.complex128)
+        y = forward(x)
+
+        results.append({
+            'name': 'fourier_wavelet_2d.forward',
+            'params': {'size': n, 'levels': 3, 'wavelet': 'db4'},
+            'time': timeit(lambda: forward(x), args.repeat),
+        })
+        results.append({
+            'name': 'fourier_wavelet_2d.adjoint',
+            'params': {'size': n, 'levels': 3, 'wavelet': 'db4'},
+            'time': timeit(lambda: adjoint(y), args.repeat),
+        })
+
+    return results
+
+
+def bench_fista(args):
+    from tools.npsensing import fourier_wavelet_2d
+    from tools.pywtwrappers import dwt2
+    from tools.reconstruction import FISTA
+
+    results = []
+    batch_size = 16
+    max_iter = 50
+
+    for n in args.sizes:
+        mask = np.random.random((n, n)) < 0.25
+        forward, adjoint = fourier_wavelet_2d('db4', 3, mask)
+
+        images = np.zeros((batch_size, n, n))
+        images[:, n // 4:3 * n // 4, n // 4:3 * n // 4] = 1
+        images += np.random.normal(0, 0.02, images.shape)
+        measurements = forward(dwt2(images, 'db4', 3))
+
+        solver = FISTA(forward, adjoint, (n, n), lam=1e-3, max_iter=max_iter, tol=0)
+
+        result_time = timeit(lambda: solver.solve(measurements), args.repeat)
+        results.append({
+            'name': 'FISTA.solve',
+            'params': {'size': n, 'batch_size': batch_size, 'max_iter': max_iter, 'levels': 3, 'wavelet': 'db4'},
+            'time': result_time,
+            'throughput': batch_size / result_time['best'],
+        })
+
+    return results
+
+
+def bench_power_method(args):
+    from tools.eigvals import power_method, matrix_function, create_rayleigh
+
+    results = []
+    for n in args.sizes:
+        A = np.random.random((n, n))
+        A = A.T @ A
+
+        operator = matrix_function(A)
+        rayleigh = create_rayleigh(A)
+
+        results.append({
+            'name': 'power_method',
+            'params': {'N': n, 'num_iter': 100},
+            'time': timeit(lambda: power_method(operator, n, rayleigh, num_iter=100), args.repeat),
+        })
+
+    return results
+
+
+def bench_patterns(args):
+    from tools import patterns
+
+    results = []
+    for n in args.sizes:
+        cases = [
+            ('gaussian_sampling', {'num_samples': n * n // 8},
+             lambda: patterns.gaussian_sampling(n, n, n * n // 8)),
+            ('level_sampling', {'sampling_rates': [1, 0.5, 0.25]},
+             lambda: patterns.level_sampling(n, n, [1, 0.5, 0.25])),
+            ('line_sampling', {'line_num': 32},
+             lambda: patterns.line_sampling(n, n, 32)),
+        ]
+
+        for name, params, func in cases:
+            params['size'] = n
+            results.append({
+                'name': name,
+                'params': params,
+                'time': timeit(func, args.repeat),
+            })
+
+    return results
+
+
+def bench_dataset(args):
+    from tools.dataset import DataSet
+
+    results = []
+    batch_size = 16
+    num_batches = 8
+
+    with tempfile.TemporaryDirectory() as directory:
+        n = max(args.sizes)
+        for i in range(batch_size * num_batches):
+            np.save(os.path.join(directory, "{:04d}.npy".format(i)), np.random.random((n, n)))
+
+        for cache in (False, True):
+            data = DataSet(directory, r".*\.npy", np.load, scale=True, cache=cache,
+                           crop=(n // 2, n // 2), collect_stats=True)
+
+            def run_epoch():
+                for _ in range(num_batches):
+                    data.ready_next_batch(batch_size)
+                    data.sample_loaded_batch(np.fft.fft2)
+                    data.get_next_batch()
+
+            # Stats should only cover the measured epochs, not the warm up
+            run_epoch()
+            data.reset_stats()
+
+            result_time = timeit(run_epoch, args.repeat)
+            stats = data.stats()
+
+            results.append({
+                'name': 'DataSet.batch',
+                'params': {'size': n, 'batch_size': batch_size, 'cache': cache},
+                'time': {key: value / num_batches if key in ('best', 'mean', 'std') else value
+                         for key, value in result_time.items()},
+                'throughput': batch_size / (result_time['best'] / num_batches),
+                'stats': {
+                    'time_per_batch': stats['time_per_batch'],
+                    'bytes_read': stats['bytes_read'],
+                    'cache_hit_rate': stats['cache_hit_rate'],
+                },
+            })
+
+    return results
+
+
+IMPORT_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+{}
+elapsed = time.perf_counter() - start
+
+# Peak RSS is inherited from the parent process on Linux, so read the current
+# RSS instead where available
+try:
+    with open('/proc/self/status') as f:
+        rss = int(next(line for line in f if line.startswith('VmRSS:')).split()[1])
+except (OSError, StopIteration):
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        rss //= 1024
+
+print(json.dumps({{
+    'time': elapsed,
+    'rss': rss,
+    'heavy_modules': [name for name in {!r} if name in sys.modules],
+}}))
+"""
+
+
+def bench_import(args):
+    # Each import is timed in a fresh interpreter. RSS is in kilobytes
+    cases = [
+        "import numpy",
+        "import tools",
+        "import tools.patterns",
+        "import tools.npsensing",
+        "import tools.dataset",
+        "import tools.reconstruction",
+    ]
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+
+    results = []
+    for statement in cases:
+        runs = []
+        for _ in range(args.repeat):
+            output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(statement, HEAVY_MODULES)],
+                                    env=env, stdout=subprocess.PIPE, check=True).stdout
+            runs.append(json.loads(output.decode()))
+
+        times = [run['time'] for run in runs]
+        results.append({
+            'name': 'import',
+            'params': {'statement': statement},
+            'time': {
+                'best': min(times),
+                'mean': float(np.mean(times)),
+                'std': float(np.std(times)),
+                'repeat': args.repeat,
+                'number': 1,
+            },
+            'rss': min(run['rss'] for run in runs),
+            'heavy_modules': runs[0]['heavy_modules'],
+        })
+
+    return results
+
+
+BENCHMARKS = {
+    'import': bench_import,
+    'dwt2': bench_dwt2,
+    'fista': bench_fista,
+    'fourier_wavelet_2d': bench_fourier_wavelet,
+    'power_method': bench_power_method,
+    'patterns': bench_patterns,
+    'dataset': bench_dataset,
+}
+
+
+def compare(old, new, threshold):
+    """
+    Print timings and RSS of new relative to old, and return the number of
+    benchmarks that are slower, or use more memory, than the given threshold.
+    """
+    def key(result):
+        return result['name'], json.dumps(result['params'], sort_keys=True)
+
+    old_results = {key(result): result for result in old['results']}
+
+    regressions = 0
+    for result in new['results']:
+        previous = old_results.get(key(result))
+        if previous is None:
+            continue
+
+        ratios = [('time', result['time']['best'] / previous['time']['best'])]
+        if 'rss' in result and 'rss' in previous:
+            ratios.append(('rss', result['rss'] / previous['rss']))
+
+        for measure, ratio in ratios:
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  <-- REGRESSION"
+                regressions += 1
+
+            print("{:30} {:50} {:4} {:6.2f}x{}".format(result['name'], key(result)[1], measure, ratio, flag))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="Benchmarks to run (default: all)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[64, 128, 256], help="Image sizes")
+    parser.add_argument("--levels", nargs="+", type=int, default=[1, 3], help="Wavelet levels")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of measurements per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", default="bench_output.json", help="File to write results to")
+    parser.add_argument("--compare", help="Earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative slowdown or RSS increase counted as a regression in --compare (default: 0.1)")
+    args = parser.parse_args()
+
+    np.random.seed(args.seed)
+
+    results = []
+    for name in args.only or sorted(BENCHMARKS):
+        print("Running {}...".format(name), file=sys.stderr)
+        results.extend(BENCHMARKS[name](args))
+
+    output = {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'results': results,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+
+    print("Wrote {} results to {}".format(len(results), args.output), file=sys.stderr)
+
+    failed = False
+
+    # Importing lightweight submodules must never pull in heavy dependencies
+    for result in results:
+        if result.get('heavy_modules'):
+            print("'{}' loaded {}".format(result['params']['statement'], ", ".join(result['heavy_modules'])),
+                  file=sys.stderr)
+            failed = True
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            old = json.load(f)
+
+        if compare(old, output, args.threshold) > 0:
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
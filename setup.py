@@ -10,5 +10,6 @@ setup(
     description='Tools for working with compressive sensing',
     url='https://github.com/uio-cs/tools',
     install_requires=['tensorflow', 'numpy'],
+    python_requires='>=3.7',
     packages=['tools'],
     zip_safe=False)
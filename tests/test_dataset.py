@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+
+from tools.dataset import DataSet, STAGES
+
+
+def _write_files(directory, num_files, size=16):
+    for i in range(num_files):
+        np.save(os.path.join(str(directory), "{:02d}.npy".format(i)), np.random.random((size, size)))
+
+    return sum(os.path.getsize(os.path.join(str(directory), fname)) for fname in os.listdir(str(directory)))
+
+
+def _run_batch(data, size):
+    data.ready_next_batch(size)
+    data.sample_loaded_batch(np.fft.fft2)
+    return data.get_next_batch()
+
+
+def test_stats_disabled_by_default(tmp_path):
+    _write_files(tmp_path, 4)
+    data = DataSet(str(tmp_path), r".*\.npy", np.load)
+
+    _run_batch(data, 2)
+
+    stats = data.stats()
+    assert stats['batches'] == 0
+    assert stats['samples'] == 0
+    assert stats['bytes_read'] == 0
+
+
+def test_stats_and_callback(tmp_path):
+    total_size = _write_files(tmp_path, 4)
+
+    received = []
+    data = DataSet(str(tmp_path), r".*\.npy", np.load, scale=True, crop=(8, 8),
+                   stats_callback=received.append)
+    assert data.collect_stats
+
+    for _ in range(2):
+        batch, sampled = _run_batch(data, 2)
+        assert batch.shape == (2, 8, 8, 1)
+        assert sampled.shape == (2, 8, 8, 1)
+
+    stats = data.stats()
+    assert stats['batches'] == 2
+    assert stats['samples'] == 4
+    assert stats['bytes_read'] == total_size
+    assert stats['cache_misses'] == 4
+    assert stats['cache_hit_rate'] == 0
+
+    assert set(stats['time']) == set(STAGES)
+    assert set(stats['time_per_batch']) == set(STAGES)
+    assert stats['last_batch'] == received[-1]
+    for stage in ('load', 'extract', 'scale', 'crop', 'sample'):
+        assert stats['time'][stage] > 0
+    assert stats['time']['augment'] == 0
+
+    assert len(received) == 2
+    for batch_times in received:
+        assert set(batch_times) == set(STAGES)
+
+
+def test_samples_counted_with_batches(tmp_path):
+    _write_files(tmp_path, 4)
+    data = DataSet(str(tmp_path), r".*\.npy", np.load, collect_stats=True)
+
+    data.ready_next_batch(2)
+    stats = data.stats()
+    assert stats['batches'] == 0
+    assert stats['samples'] == 0
+
+    data.get_next_batch()
+    stats = data.stats()
+    assert stats['batches'] == 1
+    assert stats['samples'] == 2
+
+
+def test_stats_cache_hits(tmp_path):
+    total_size = _write_files(tmp_path, 4)
+    data = DataSet(str(tmp_path), r".*\.npy", np.load, cache=True, collect_stats=True)
+
+    # First pass reads every file, the second is served from the cache
+    _run_batch(data, 4)
+    _run_batch(data, 4)
+
+    stats = data.stats()
+    assert stats['bytes_read'] == total_size
+    assert stats['cache_misses'] == 4
+    assert stats['cache_hits'] == 4
+    assert stats['cache_hit_rate'] == 0.5
+
+    data.reset_stats()
+    _run_batch(data, 4)
+
+    stats = data.stats()
+    assert stats['bytes_read'] == 0
+    assert stats['cache_hit_rate'] == 1
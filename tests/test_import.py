@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+# Modules that should only be loaded when the submodules needing them are used.
+# Keep in sync with HEAVY_MODULES in benchmarks/run.py
+HEAVY_MODULES = ['tensorflow', 'matplotlib', 'sigpy']
+
+
+def _run_fresh(script):
+    # Run in a fresh interpreter, so modules loaded by other tests (or by
+    # pytest collecting them) don't count
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+
+    output = subprocess.run([sys.executable, "-c", script], env=env, stdout=subprocess.PIPE, check=True).stdout
+    return output.decode().strip()
+
+
+def _loaded_modules(statement, names):
+    script = "import sys\n{}\nprint(','.join(name for name in {!r} if name in sys.modules))".format(
+        statement, names)
+
+    return [name for name in _run_fresh(script).split(",") if name]
+
+
+@pytest.mark.parametrize("statement", [
+    "import tools",
+    "import tools.patterns",
+    "import tools.npsensing",
+    "import tools.dataset",
+    "import tools.reconstruction",
+])
+def test_no_heavy_imports(statement):
+    assert _loaded_modules(statement, HEAVY_MODULES) == []
+
+
+def test_import_loads_no_submodules():
+    # This is what keeps `import tools` cheap. Startup time and RSS are
+    # tracked by the import benchmark in benchmarks/run.py
+    script = "import sys\nimport tools\nprint(','.join(name for name in sys.modules if name.startswith('tools.')))"
+    assert _run_fresh(script) == ""
+
+    assert _loaded_modules("import tools", ['numpy', 'scipy', 'pywt', 'psutil']) == []
+
+
+def test_submodules_load_on_access():
+    script = "\n".join([
+        "import sys",
+        "import tools",
+        "assert 'tools.pywtwrappers' not in sys.modules",
+        "assert 'pywtwrappers' not in vars(tools)",
+        "module = tools.pywtwrappers",
+        "assert sys.modules['tools.pywtwrappers'] is module",
+        "assert vars(tools)['pywtwrappers'] is module",
+        "assert callable(module.dwt2)",
+        "assert 'tools.patterns' not in sys.modules",
+        "try:",
+        "    tools.does_not_exist",
+        "except AttributeError:",
+        "    print('ok')",
+    ])
+
+    assert _run_fresh(script) == "ok"
@@ -0,0 +1,44 @@
+import numpy as np
+
+from tools.npsensing import fourier_wavelet_2d
+
+
+def _random_complex(shape):
+    return np.random.normal(size=shape) + 1j * np.random.normal(size=shape)
+
+
+def test_fourier_wavelet_2d_adjoint():
+    mask = np.random.random((32, 32)) < 0.3
+    forward, adjoint = fourier_wavelet_2d('db4', 3, mask)
+
+    x = _random_complex((32, 32))
+    y = _random_complex((32, 32))
+
+    # <Ax, y> = <x, A*y>, also for y with entries outside the mask
+    assert np.isclose(np.vdot(forward(x), y), np.vdot(x, adjoint(y)))
+
+
+def test_fourier_wavelet_2d_adjoint_masks_input():
+    mask = np.random.random((32, 32)) < 0.3
+    _, adjoint = fourier_wavelet_2d('db4', 3, mask)
+
+    y = _random_complex((32, 32))
+    masked = y.copy()
+    masked[~mask] = 0
+
+    assert np.allclose(adjoint(y), adjoint(masked))
+
+
+def test_fourier_wavelet_2d_batch_matches_single_images():
+    mask = np.random.random((32, 32)) < 0.3
+    forward, adjoint = fourier_wavelet_2d('db4', 3, mask)
+
+    x = _random_complex((4, 32, 32))
+    y = _random_complex((4, 32, 32))
+
+    forward_batch = forward(x)
+    adjoint_batch = adjoint(y)
+
+    for i in range(len(x)):
+        assert np.allclose(forward_batch[i], forward(x[i]))
+        assert np.allclose(adjoint_batch[i], adjoint(y[i]))
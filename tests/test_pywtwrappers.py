@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from tools.pywtwrappers import dwt2, idwt2
+
+
+@pytest.mark.parametrize("levels", [1, 3])
+def test_perfect_reconstruction(levels):
+    x = np.random.random((32, 32))
+
+    assert np.allclose(idwt2(dwt2(x, 'db4', levels), 'db4', levels), x)
+
+
+@pytest.mark.parametrize("levels", [0, 1, 3])
+def test_batch_matches_single_images(levels):
+    batch = np.random.random((3, 32, 32)) + 1j * np.random.random((3, 32, 32))
+
+    coeffs = dwt2(batch, 'db4', levels)
+    images = idwt2(coeffs, 'db4', levels)
+
+    assert coeffs.shape == batch.shape
+    for i in range(len(batch)):
+        assert np.allclose(coeffs[i], dwt2(batch[i], 'db4', levels))
+        assert np.allclose(images[i], idwt2(coeffs[i], 'db4', levels))
@@ -0,0 +1,178 @@
+import numpy as np
+import pytest
+
+from tools.npsensing import fourier_wavelet_2d
+from tools.pywtwrappers import dwt2
+from tools.reconstruction import FISTA, soft_threshold
+
+
+N = 32
+LEVELS = 2
+
+
+def _problem(batch_size=4):
+    np.random.seed(0)
+    mask = np.random.random((N, N)) < 0.4
+    forward, adjoint = fourier_wavelet_2d('db4', LEVELS, mask)
+
+    images = np.zeros((batch_size, N, N))
+    for i in range(batch_size):
+        images[i, 4 + i:20 + 2 * i, 8:24] = 1 + i
+    images += np.random.normal(0, 0.01, images.shape)
+
+    return forward, adjoint, forward(dwt2(images, 'db4', LEVELS))
+
+
+def _reference(forward, adjoint, y, step, lam, accelerate, max_iter, tol):
+    # Straightforward (F)ISTA on a single image
+    x = np.zeros((N, N), dtype=complex)
+    z = x.copy()
+    t = 1.
+    for k in range(max_iter):
+        x_new = soft_threshold(z - step * adjoint(forward(z) - y), step * lam)
+
+        old_norm = np.linalg.norm(x)
+        difference_norm = np.linalg.norm(x_new - x)
+        if difference_norm == 0:
+            change = 0
+        elif old_norm == 0:
+            change = np.inf
+        else:
+            change = difference_norm / old_norm
+
+        if accelerate:
+            t_new = (1 + np.sqrt(1 + 4 * t**2)) / 2
+            z = x_new + (t - 1) / t_new * (x_new - x)
+            t = t_new
+        else:
+            z = x_new
+        x = x_new
+
+        if change < tol:
+            return x, k + 1
+
+    return x, max_iter
+
+
+def _objective(forward, x, y, lam):
+    return 0.5 * np.linalg.norm(forward(x) - y)**2 + lam * np.sum(np.abs(x))
+
+
+def test_soft_threshold():
+    x = np.array([3 + 4j, 0.5, -2, 0])
+
+    assert np.allclose(soft_threshold(x, 1), [(3 + 4j) * 0.8, 0, -1, 0])
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("dtype", [np.complex64, np.complex128])
+def test_soft_threshold_large_threshold(dtype):
+    x = np.array([0, 10, 3 + 4j], dtype=dtype)
+    work = np.empty(3, dtype=np.finfo(dtype).dtype)
+
+    assert np.allclose(soft_threshold(x, 5., work=work), [0, 5, 0])
+    assert np.allclose(soft_threshold(x, 1e30, out=x), 0)
+
+
+@pytest.mark.filterwarnings("error")
+def test_large_lam():
+    forward, adjoint, y = _problem()
+
+    solver = FISTA(forward, adjoint, (N, N), lam=1e6, max_iter=20)
+    x, info = solver.solve(y)
+
+    assert np.all(x == 0)
+    assert np.all(info['converged'])
+
+
+@pytest.mark.parametrize("accelerate", [False, True])
+def test_matches_per_image_loop(accelerate):
+    forward, adjoint, y = _problem()
+
+    solver = FISTA(forward, adjoint, (N, N), lam=1e-2, accelerate=accelerate, max_iter=200, tol=1e-3)
+    x, info = solver.solve(y)
+
+    # Images should stop at different iterations, to exercise the compaction
+    assert len(set(info['iterations'])) > 1
+
+    for i in range(len(y)):
+        x_ref, iterations = _reference(forward, adjoint, y[i], solver.step, solver.lam,
+                                       accelerate, solver.max_iter, solver.tol)
+        assert info['iterations'][i] == iterations
+        assert info['converged'][i] == (iterations < solver.max_iter)
+        assert np.allclose(x[i], x_ref)
+        assert np.isclose(info['residual'][i], np.linalg.norm(forward(x_ref) - y[i]))
+
+
+def test_fista_beats_ista():
+    forward, adjoint, y = _problem()
+
+    fista = FISTA(forward, adjoint, (N, N), lam=1e-2, max_iter=30, tol=0)
+    ista = FISTA(forward, adjoint, (N, N), lam=1e-2, accelerate=False, max_iter=30, tol=0)
+    x_fista, _ = fista.solve(y)
+    x_ista, _ = ista.solve(y)
+
+    for i in range(len(y)):
+        assert _objective(forward, x_fista[i], y[i], 1e-2) < _objective(forward, x_ista[i], y[i], 1e-2)
+
+
+def test_step_from_operator_norm():
+    forward, adjoint, _ = _problem()
+
+    # P F W* with orthogonal wavelets has norm 1
+    solver = FISTA(forward, adjoint, (N, N), lam=1e-2)
+    assert np.isclose(solver.step, 0.99, rtol=1e-3)
+
+    solver = FISTA(lambda x: 2 * x, lambda y: 2 * y, (N, N), lam=1e-2)
+    assert np.isclose(solver.step, 0.99 / 4, rtol=1e-3)
+
+
+def test_step_estimate_keeps_random_state():
+    forward, adjoint, _ = _problem()
+
+    np.random.seed(1)
+    expected = np.random.random(3)
+
+    np.random.seed(1)
+    FISTA(forward, adjoint, (N, N), lam=1e-2)
+    assert np.array_equal(np.random.random(3), expected)
+
+
+def test_real_valued_operators():
+    y = np.random.random((2, 8))
+
+    solver = FISTA(lambda x: 2 * np.real(x), lambda y: 2 * y, (8,), lam=1e-2, max_iter=20)
+    x, info = solver.solve(y)
+
+    assert x.shape == (2, 8)
+    assert np.allclose(x.imag, 0)
+
+
+def test_buffers_reused():
+    forward, adjoint, y = _problem()
+
+    solver = FISTA(forward, adjoint, (N, N), lam=1e-2, max_iter=50, tol=1e-3)
+    x_first, info_first = solver.solve(y)
+    buffers = solver._buffers
+    x_second, info_second = solver.solve(y)
+
+    assert solver._buffers is buffers
+    assert np.allclose(x_first, x_second)
+    assert np.array_equal(info_first['iterations'], info_second['iterations'])
+
+    # A different batch size needs new buffers
+    solver.solve(y[:2])
+    assert solver._buffers is not buffers
+
+
+def test_callback():
+    forward, adjoint, y = _problem()
+
+    calls = []
+    solver = FISTA(forward, adjoint, (N, N), lam=1e-2, max_iter=200, tol=1e-3)
+    _, info = solver.solve(y, callback=lambda k, active, change: calls.append((k, active, change)))
+
+    assert len(calls) == max(info['iterations'])
+    for k, active, change in calls:
+        assert np.array_equal(active, info['iterations'] > k)
+        assert np.all(change[~active] == 0)
@@ -1,7 +1,24 @@
-from . import eigvals
-from . import patterns
-from . import pywtwrappers
-from . import npsensing
-from . import crap
-from . import dataset
+"""
+Tools for working with compressive sensing.
 
+Submodules are imported on first access (e.g. `tools.patterns`), so that
+`import tools` does not pull in heavy dependencies like TensorFlow unless the
+modules needing them are actually used.
+"""
+import importlib
+
+__all__ = ['eigvals', 'patterns', 'pywtwrappers', 'npsensing', 'crap', 'dataset',
+           'reconstruction']
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module("." + name, __name__)
+        globals()[name] = module
+        return module
+
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,18 +1,24 @@
-from collections import Sized
+from collections.abc import Sized
 
 import numpy as np
-import sigpy as sp
+import psutil
 
+import math
 import random
 import re
 import os
 import sys
+import time
+
+
+STAGES = ('load', 'extract', 'scale', 'crop', 'augment', 'sample')
 
 
 class DataSet(Sized):
 
     def __init__(self, directory, namepattern, fileloader, data_key=None, label_key=None,
-                 scale=False, cache=False, augment=False, crop=None, test_rate=0):
+                 scale=False, cache=False, augment=False, crop=None, test_rate=0,
+                 collect_stats=False, stats_callback=None):
         """
 
         Args:
@@ -26,6 +32,11 @@ class DataSet(Sized):
             augment (bool):         Apply data augmentation
             crop (tuple):           Crop all data to be this size (crops from center)
             test_rate (float):      Size of test set relative to training set
+            collect_stats (bool):   Record timings and counters for each pipeline stage,
+                                    see stats()
+            stats_callback (callable): Optional. Called with a dictionary of per-batch
+                                    timings each time a batch is fetched with
+                                    get_next_batch(). Implies collect_stats
         """
         self.fileloader = fileloader
         self.data_key = data_key
@@ -53,6 +64,10 @@ class DataSet(Sized):
         self.next_batch_sampled = None
         self.next_batch_labels = None
 
+        self.collect_stats = collect_stats or stats_callback is not None
+        self.stats_callback = stats_callback
+        self.reset_stats()
+
 
     def _traverse_dir_and_queue_files(self, directory, namepattern):
         # Compile regex for faster searching
@@ -75,6 +90,7 @@ class DataSet(Sized):
             return False
         else:
             if psutil.virtual_memory().available < self.cache_threshold*1e6:
+                if self.collect_stats: self._stats['cache_stopped'] = True
                 print()
                 print("Less than {} mb left in memory, DataSet will not cache any more files".format(self.cache_threshold), file=sys.stderr)
                 self.stop_cache = True
@@ -85,8 +101,12 @@ class DataSet(Sized):
 
     def _get_data_sample(self, filename):
         if filename in self.cached_files:
+            if self.collect_stats: self._stats['cache_hits'] += 1
             return self.cached_files[filename]
         else:
+            if self.collect_stats:
+                self._stats['cache_misses'] += 1
+                self._stats['bytes_read'] += os.path.getsize(filename)
             file = self.fileloader(filename)
             if self.cache and self._enough_memory(): self.cached_files[filename] = file
             return file
@@ -111,9 +131,16 @@ class DataSet(Sized):
         data_list = [None] * size
         label_list = [None] * size
 
+        timing = self.collect_stats
+        if timing:
+            self._batch_times = dict.fromkeys(STAGES, 0.0)
+            self._batch_size = size
+            t = time.perf_counter()
+
         # Read files and store temporarily
         for i in range(size):
             local_raw_data = self._get_data_sample(self._get_next())
+            if timing: t = self._lap('load', t)
 
             if self.data_key is not None:
                 local_data = local_raw_data[self.data_key]
@@ -122,15 +149,18 @@ class DataSet(Sized):
 
             if self.label_key is not None:
                 label_list[i] = local_raw_data[self.label_key]
+            if timing: t = self._lap('extract', t)
 
             # Map to [0, 1]
             if self.scale:
                 local_data -= np.min(np.abs(local_data))
                 local_data /= np.max(np.abs(local_data))
+                if timing: t = self._lap('scale', t)
 
             if self.crop is not None:
                 middle = list(map(lambda x: x//2, local_data.shape))
                 local_data = local_data[middle[0] - self.crop[0]//2 : middle[0] + self.crop[0]//2, middle[1] - self.crop[1] // 2 : middle[1] + self.crop[1]//2]
+                if timing: t = self._lap('crop', t)
 
             data_list[i] = local_data
 
@@ -138,7 +168,9 @@ class DataSet(Sized):
         next_batch = np.array(data_list)
 
         if self.augment:
+            if timing: t = time.perf_counter()
             augment(next_batch)
+            if timing: self._lap('augment', t)
 
         self.next_batch = next_batch
 
@@ -155,6 +187,9 @@ class DataSet(Sized):
 
 
     def get_next_batch(self):
+        if self.collect_stats and self._batch_times is not None:
+            self._finish_batch()
+
         temp_batch = self._fix_dimensions(self.next_batch)
         self.next_batch = None
 
@@ -176,6 +211,8 @@ class DataSet(Sized):
 
 
     def sample_loaded_batch(self, operator):
+        if self.collect_stats: t = time.perf_counter()
+
         data_list = [None] * len(self.next_batch)
 
         for i in range(len(data_list)):
@@ -183,6 +220,9 @@ class DataSet(Sized):
 
         self.next_batch_sampled = np.array(data_list, dtype=np.complex64)
 
+        if self.collect_stats and self._batch_times is not None:
+            self._lap('sample', t)
+
 
     def get_test_set(self, sample_op=None):
         data_list = [None] * len(self.test_files)
@@ -225,6 +265,77 @@ class DataSet(Sized):
         return return_this
 
 
+    def _lap(self, stage, start):
+        # Add time since start to the given stage of the current batch, and
+        # return the current time so consecutive stages can be chained
+        now = time.perf_counter()
+        self._batch_times[stage] += now - start
+        return now
+
+
+    def _finish_batch(self):
+        batch_times = self._batch_times
+        self._batch_times = None
+
+        for stage, elapsed in batch_times.items():
+            self._stats['time'][stage] += elapsed
+        self._stats['batches'] += 1
+        self._stats['samples'] += self._batch_size
+        self._stats['last_batch'] = batch_times
+
+        if self.stats_callback is not None:
+            self.stats_callback(dict(batch_times))
+
+
+    def reset_stats(self):
+        """
+        Clear all timings and counters collected so far.
+        """
+        self._stats = {
+            'batches': 0,
+            'samples': 0,
+            'bytes_read': 0,
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'cache_stopped': False,
+            'time': dict.fromkeys(STAGES, 0.0),
+            'last_batch': None,
+        }
+        self._batch_times = None
+        self._batch_size = 0
+
+
+    def stats(self):
+        """
+        Get timings and counters for the data pipeline. Only populated if the
+        DataSet was created with collect_stats=True (or a stats_callback).
+
+        Timings are in seconds, per stage (see STAGES). A batch is counted once
+        it has been fetched with get_next_batch().
+
+        Returns:
+            dict: Dictionary with the keys
+                    'batches', 'samples':   Number of batches and samples processed
+                    'bytes_read':           Size of the files read from disk
+                    'cache_hits', 'cache_misses', 'cache_hit_rate':
+                                            Lookups in the in-memory cache
+                    'cache_stopped':        Whether caching stopped due to low memory
+                    'time':                 Cumulative time spent in each stage
+                    'time_per_batch':       Mean time per batch spent in each stage
+                    'last_batch':           Time spent in each stage for the latest batch
+        """
+        stats = dict(self._stats)
+        stats['time'] = dict(stats['time'])
+
+        lookups = stats['cache_hits'] + stats['cache_misses']
+        stats['cache_hit_rate'] = stats['cache_hits'] / lookups if lookups else 0.0
+
+        batches = max(stats['batches'], 1)
+        stats['time_per_batch'] = {stage: elapsed / batches for stage, elapsed in stats['time'].items()}
+
+        return stats
+
+
     def __len__(self):
         return len(self.data_files)
 
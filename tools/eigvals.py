@@ -1,6 +1,5 @@
 
 import numpy as np
-import matplotlib.pyplot as plt
 
 def power_method(operator, N, rayleigh_op=None, num_iter=1000):
     """
@@ -16,7 +16,9 @@ def fourier_wavelet_2d(wavelet, levels, mask):
         reordered appropriately.
 
     Returns:
-        Two functions that take an ndarray, and computes the forward an backwards transform
+        Two functions that take an ndarray, and computes the forward an backwards transform.
+        The transforms act on the two last axes, so a batch of shape
+        [batch, height, width] can be given as well as a single image.
     """
 
     def forward(x):
@@ -29,7 +31,7 @@ def fourier_wavelet_2d(wavelet, levels, mask):
         """
         result = idwt2(x, wavelet, levels)
         result = np.fft.fft2(result, norm='ortho')
-        result[~mask] = 0
+        result[..., ~mask] = 0
         return result
 
 
@@ -38,8 +40,8 @@ def fourier_wavelet_2d(wavelet, levels, mask):
 
         """
         result = x.copy()
-        result[~mask] = 0
-        result = np.fft.ifft2(x, norm='ortho')
+        result[..., ~mask] = 0
+        result = np.fft.ifft2(result, norm='ortho')
         result = dwt2(result, wavelet, levels)
 
         return result
@@ -45,14 +45,14 @@ def gaussian_sampling(len_x, len_y, num_samples, spread_factor=5):
     ys = randgen_y.rvs(num_samples).astype(np.uint32)
 
     # Create mask
-    mask = np.zeros([len_y, len_x], dtype=np.bool)
+    mask = np.zeros([len_y, len_x], dtype=bool)
     for i in range(num_samples):
         x, y = xs[i], ys[i]
 
         # Ensure unique samples
         while mask[y, x]:
-            x = randgen_x.rvs(1).astype(np.uint32)
-            y = randgen_y.rvs(1).astype(np.uint32)
+            x = randgen_x.rvs(1).astype(np.uint32)[0]
+            y = randgen_y.rvs(1).astype(np.uint32)[0]
 
         xs[i], ys[i] = x, y
 
@@ -79,7 +79,7 @@ def level_sampling(len_x, len_y, sampling_rates):
     """
     levels = len(sampling_rates)
 
-    mask = np.zeros([len_y, len_x], dtype=np.bool)
+    mask = np.zeros([len_y, len_x], dtype=bool)
 
 
     # Local function for making each level (inplace)
@@ -132,7 +132,7 @@ def line_sampling(len_x, len_y, line_num, dilations=1, close=True):
     Returns:
         np.ndarray: A boolean numpy array (mask) depicting sampling pattern.
     """
-    mask = np.zeros([len_y, len_x], dtype=np.bool)
+    mask = np.zeros([len_y, len_x], dtype=bool)
 
     center = len_y // 2, len_x // 2
 
@@ -12,6 +12,9 @@ NOTE: What pywavelets call cV and cH is reversed from what is typical. These fun
 |        |        |
 +--------+--------+
 
+dwt2 and idwt2 transform the two last axes, so a batch of images with shape
+[batch, height, width] can be transformed at once.
+
 TODO: IDWT is computed by copying the entire array. It might be a good idea to
 do this inplace. This can be done by simply removing the z = z.copy() lines,
 but beware that this modifies the input array. A workaround might be to just
@@ -38,15 +41,15 @@ def idwt2(z, wavelet, levels=1, mode='periodization'):
     elif levels < 0:
         raise ValueError('levels must be non-negative')
 
-    n = z.shape[0]//(2**levels)
+    n = z.shape[-2]//(2**levels)
     m = 2*n
-    cA = z[:n,:n]
-    cH = z[:n,n:m]
-    cV = z[n:m,:n]
-    cD = z[n:m,n:m]
+    cA = z[..., :n,:n]
+    cH = z[..., :n,n:m]
+    cV = z[..., n:m,:n]
+    cD = z[..., n:m,n:m]
 
     z = z.copy()
-    z[:m, :m] = pywt.idwt2((cA, (cV, cH, cD)), wavelet, mode)
+    z[..., :m, :m] = pywt.idwt2((cA, (cV, cH, cD)), wavelet, mode)
 
     return idwt2(z, wavelet, levels-1, mode)
 
@@ -0,0 +1,253 @@
+'''Batched reconstruction by (F)ISTA with soft thresholding in the wavelet
+domain.
+
+Solves
+
+    min_x  1/2 ||A x - y||_2^2 + lam ||x||_1
+
+for every measurement y in a batch at once, where A is typically the operator
+P F W* from npsensing.fourier_wavelet_2d, and x are wavelet coefficients. The
+reconstructed images are then given by pywtwrappers.idwt2(x, wavelet, levels).
+'''
+import numpy as np
+
+from .eigvals import power_method
+
+
+def soft_threshold(x, threshold, out=None, work=None):
+    """
+    Complex soft thresholding, x * max(1 - threshold/|x|, 0).
+
+    Args:
+        x (np.ndarray):         Input array. Can be complex
+        threshold (float):      Threshold
+        out (np.ndarray):       Optional. Array to place the result in. Can be x
+        work (np.ndarray):      Optional. Real array of the same shape as x, used
+                                for intermediate results
+
+    Returns:
+        np.ndarray: The thresholded array
+    """
+    magnitude = np.abs(x, out=work)
+
+    # Only divide where the result is kept, to avoid dividing by (close to) zero
+    keep = magnitude > threshold
+    np.divide(threshold, magnitude, out=magnitude, where=keep)
+    np.subtract(1, magnitude, out=magnitude, where=keep)
+    np.logical_not(keep, out=keep)
+    np.copyto(magnitude, 0, where=keep)
+
+    return np.multiply(x, magnitude, out=out)
+
+
+def _batch_norm(x):
+    return np.linalg.norm(x.reshape(x.shape[0], -1), axis=1)
+
+
+class FISTA(object):
+
+    def __init__(self, forward, adjoint, shape, lam, step=None, accelerate=True,
+                 max_iter=100, tol=1e-4, power_iter=50):
+        """
+        Reconstruction engine running FISTA (or ISTA) on batches of measurements.
+        Work buffers are kept between calls to solve() as long as the shape
+        and type of the measurements stay the same.
+
+        Args:
+            forward (callable):     Forward operator A. Must act on batches, ie
+                                    arrays of shape [batch, *shape]
+            adjoint (callable):     Adjoint operator A*, acting on batches
+            shape (tuple):          Shape of a single coefficient array, eg
+                                    (height, width)
+            lam (float):            Regularization parameter for the l1 term
+            step (float):           Step size. If None, 0.99/||A||^2 is used, with
+                                    the operator norm estimated by the power method.
+                                    The estimate approaches ||A||^2 from below, so the
+                                    factor 0.99 keeps the step safely below 1/||A||^2
+            accelerate (bool):      Use FISTA momentum. If False, runs plain ISTA
+            max_iter (int):         Maximum number of iterations
+            tol (float):            Stop iterating on an image when the relative
+                                    change ||x_k+1 - x_k|| / ||x_k|| is below this
+            power_iter (int):       Number of power iterations used to estimate
+                                    the operator norm
+        """
+        self.forward = forward
+        self.adjoint = adjoint
+        self.shape = tuple(shape)
+        self.lam = lam
+        self.accelerate = accelerate
+        self.max_iter = max_iter
+        self.tol = tol
+
+        if step is None:
+            step = 0.99 / self.estimate_lipschitz(power_iter)
+        self.step = step
+
+        self._buffers = None
+
+
+    def estimate_lipschitz(self, num_iter=50):
+        """
+        Estimate ||A||^2, ie the largest eigenvalue of A*A, by the power method.
+        The global NumPy random state is restored afterwards, so the random
+        start vector does not affect the caller's random stream.
+
+        Args:
+            num_iter (int):         Number of power iterations
+
+        Returns:
+            float: The estimated squared operator norm
+        """
+        def normal_op(x):
+            return self.adjoint(self.forward(x))
+
+        def rayleigh_op(x):
+            return np.real(np.vdot(x, normal_op(x))) / np.real(np.vdot(x, x))
+
+        state = np.random.get_state()
+        try:
+            _, eigval = power_method(normal_op, (1,) + self.shape, rayleigh_op, num_iter=num_iter)
+        finally:
+            np.random.set_state(state)
+
+        return eigval
+
+
+    def _allocate(self, batch_size, dtype, measurement_shape):
+        shape = (batch_size,) + self.shape
+        key = (shape, dtype, measurement_shape)
+        if self._buffers is not None and self._buffers['key'] == key:
+            return self._buffers
+
+        real_dtype = np.finfo(dtype).dtype
+        self._buffers = {
+            'key': key,
+            'x': np.empty(shape, dtype=dtype),
+            'z': np.empty(shape, dtype=dtype),
+            'work': np.empty(shape, dtype=dtype),
+            'difference': np.empty(shape, dtype=dtype),
+            'magnitude': np.empty(shape, dtype=real_dtype),
+            'y': np.empty((batch_size,) + measurement_shape, dtype=dtype),
+            'residual': np.empty((batch_size,) + measurement_shape, dtype=dtype),
+            't': np.empty(batch_size),
+            'order': np.empty(batch_size, dtype=np.intp),
+        }
+
+        return self._buffers
+
+
+    def solve(self, measurements, x0=None, callback=None):
+        """
+        Reconstruct a batch of measurements.
+
+        Args:
+            measurements (np.ndarray):  Batch of measurements y, ie an array of
+                                        shape [batch, ...] matching the output of
+                                        the forward operator
+            x0 (np.ndarray):            Optional. Initial guess of shape
+                                        [batch, *shape]. Defaults to zero
+            callback (callable):        Optional. Called after each iteration as
+                                        callback(iteration, active, change), where
+                                        active is a boolean array of images still
+                                        being iterated on, and change their relative
+                                        change in this iteration
+
+        Returns:
+            Tuple of the reconstructed coefficients with shape [batch, *shape], and
+            a dictionary with
+                'iterations':   Number of iterations run for each image
+                'converged':    Whether each image reached the tolerance
+                'residual':     Final residual ||A x - y|| for each image
+        """
+        batch_size = measurements.shape[0]
+        dtype = np.result_type(measurements.dtype, np.complex64)
+        buffers = self._allocate(batch_size, dtype, measurements.shape[1:])
+
+        x, z, work, difference = buffers['x'], buffers['z'], buffers['work'], buffers['difference']
+        magnitude, y, residual = buffers['magnitude'], buffers['y'], buffers['residual']
+        t, order = buffers['t'], buffers['order']
+
+        if x0 is None:
+            x.fill(0)
+        else:
+            x[...] = x0
+        z[...] = x
+        y[...] = measurements
+        t.fill(1)
+
+        # The images still being iterated on are kept in the first num_active
+        # entries of the buffers, and order maps them back to the batch
+        order[:] = np.arange(batch_size)
+        num_active = batch_size
+
+        result = np.empty((batch_size,) + self.shape, dtype=dtype)
+        iterations = np.full(batch_size, self.max_iter)
+        converged = np.zeros(batch_size, dtype=bool)
+
+        threshold = self.step * self.lam
+        broadcast = (-1,) + (1,) * len(self.shape)
+
+        for k in range(self.max_iter):
+            n = num_active
+            x_a, z_a, work_a, difference_a = x[:n], z[:n], work[:n], difference[:n]
+
+            # Gradient step from z, followed by the proximal operator. The
+            # result is kept in work
+            np.subtract(self.forward(z_a), y[:n], out=residual[:n])
+            np.multiply(self.adjoint(residual[:n]), self.step, out=work_a)
+            np.subtract(z_a, work_a, out=work_a)
+            soft_threshold(work_a, threshold, out=work_a, work=magnitude[:n])
+
+            np.subtract(work_a, x_a, out=difference_a)
+            difference_norm = _batch_norm(difference_a)
+            old_norm = _batch_norm(x_a)
+            change = np.divide(difference_norm, old_norm, out=np.full_like(difference_norm, np.inf),
+                               where=old_norm > 0)
+            change[difference_norm == 0] = 0
+
+            if self.accelerate:
+                t_new = (1 + np.sqrt(1 + 4 * t[:n]**2)) / 2
+                momentum = ((t[:n] - 1) / t_new).reshape(broadcast)
+                np.multiply(difference_a, momentum, out=difference_a)
+                np.add(work_a, difference_a, out=z_a)
+                t[:n] = t_new
+            else:
+                z_a[...] = work_a
+
+            x_a[...] = work_a
+
+            if callback is not None:
+                active = np.zeros(batch_size, dtype=bool)
+                active[order[:n]] = True
+                batch_change = np.zeros(batch_size)
+                batch_change[order[:n]] = change
+                callback(k, active, batch_change)
+
+            # Images changing less than the tolerance are done. Store them, and
+            # move the remaining ones to the front of the buffers
+            done = change < self.tol
+            if done.any():
+                finished = order[:n][done]
+                result[finished] = x_a[done]
+                iterations[finished] = k + 1
+                converged[finished] = True
+
+                num_active = 0
+                for i in np.flatnonzero(~done):
+                    if i != num_active:
+                        for buffer in (x, z, y, t, order):
+                            buffer[num_active] = buffer[i]
+                    num_active += 1
+
+            if num_active == 0:
+                break
+
+        result[order[:num_active]] = x[:num_active]
+
+        info = {
+            'iterations': iterations,
+            'converged': converged,
+            'residual': _batch_norm(self.forward(result) - measurements),
+        }
+
+        return result, info